@@ -1,38 +1,165 @@
+import asyncio
+import atexit
 import csv
+import hashlib
+import io
 import os
-import time
+import re
 import logging
+import queue
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Tuple
-import requests
+from itertools import accumulate, chain, groupby
+from logging.handlers import QueueHandler, QueueListener
+from typing import AsyncIterator, Iterable, Iterator, List, Dict, Optional, Tuple
+import ahocorasick
+import ctranslate2
+import diskcache
+import httpx
+import numpy as np
+import phonenumbers
+from aiohttp import web
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
-import openai
+from twilio.request_validator import RequestValidator
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
 
-# Налаштування логування
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('phone_validation.log'),
-        logging.StreamHandler()
-    ]
-)
+try:
+    import acoustid
+    import chromaprint
+except ImportError:  # Акустичні відбитки необов'язкові (потрібна libchromaprint)
+    acoustid = chromaprint = None
+
+try:
+    import hyperscan
+except ImportError:  # Без Hyperscan фрази шукає автомат Ахо-Корасік
+    hyperscan = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # Без pyarrow CSV читає стандартний модуль csv
+    pa = pc = pa_csv = None
+
+try:
+    import h2  # noqa: F401 - потрібен httpx для HTTP/2
+except ImportError:  # Без h2 завантаження йдуть через HTTP/1.1 з keep-alive
+    h2 = None
+
+try:
+    import uvloop
+except ImportError:  # Без uvloop використовується стандартний цикл asyncio
+    uvloop = None
+
+# Налаштування логування (запис у файл і консоль виконується окремим потоком через чергу)
+log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+log_handlers = [
+    logging.FileHandler('phone_validation.log'),
+    logging.StreamHandler()
+]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# У черзі лише текст повідомлення; час і рівень додають обробники слухача
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
 logger = logging.getLogger(__name__)
 
 class PhoneValidator:
     def __init__(self):
+        # Перевірка до створення клієнтів, кешів і баз даних
+        self._validate_credentials()
+        
         # Twilio налаштування
         self.twilio_account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.twilio_auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.twilio_phone_number = os.getenv('TWILIO_PHONE_NUMBER')  # Ваш Twilio номер
         
-        # OpenAI налаштування
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
+        # Вебхук для статусів дзвінків (публічна адреса, наприклад через ngrok)
+        self.webhook_base_url = (os.getenv('WEBHOOK_BASE_URL') or '').rstrip('/')
+        self.webhook_port = int(os.getenv('WEBHOOK_PORT', '8080'))
+        
+        # Whisper налаштування (модель завантажується один раз, при першому використанні)
+        self.whisper_model_size = os.getenv('WHISPER_MODEL', 'small')
+        
+        # Квантизація: int8_float16 на GPU, int8 на CPU (VNNI/AMX обирає CTranslate2)
+        has_cuda = ctranslate2.get_cuda_device_count() > 0
+        self.whisper_device = os.getenv('WHISPER_DEVICE') or ('cuda' if has_cuda else 'cpu')
+        self.whisper_compute_type = os.getenv('WHISPER_COMPUTE_TYPE') or (
+            'int8_float16' if self.whisper_device == 'cuda' else 'int8'
+        )
+        self.whisper_cpu_threads = int(os.getenv('WHISPER_CPU_THREADS', '0'))  # 0 - OMP_NUM_THREADS або типове значення
+        self.whisper_language = 'uk'  # Українська мова
+        
+        # Тексти з кешів належать моделі, яка їх розпізнала: інша модель чи мова їх не бачить
+        self.transcript_model = f'{self.whisper_model_size}/{self.whisper_compute_type}/{self.whisper_language}'
+        
+        self._whisper = None
+        self._batched_whisper = None
+        self._whisper_lock = threading.Lock()
+        
+        # Кеш розпізнаних текстів за хешем аудіо (повідомлення операторів повторюються)
+        self.transcript_cache_dir = os.getenv('WHISPER_CACHE_DIR', './whisper_cache')
+        self.transcript_cache = diskcache.Cache(self.transcript_cache_dir, size_limit=256 * 1024 * 1024)
+        self.transcript_cache_ttl = 30 * 24 * 3600  # секунди
+        
+        # Кеш текстів за акустичним відбитком (схожі, але не ідентичні записи)
+        self.fingerprint_seconds = 4
+        self.fingerprint_threshold = 0.05  # частка бітів, що відрізняються
+        self.fingerprint_min_active = 0.5  # частка кадрів з сигналом, тиша не порівнюється
+        self.fingerprint_ttl = self.transcript_cache_ttl  # секунди
+        self.fingerprint_max_rows = 10000
+        self.fingerprint_max_candidates = 32  # найновіші відбитки зі спільним ключем
+        self.fingerprint_key_words = 12  # перші слова відбитка, за старшими бітами яких шукаються кандидати
+        self.fingerprint_max_offset = 4  # зсув у словах (~0.12 с кожне) між схожими записами
+        self.fingerprint_db_path = os.getenv('FINGERPRINTS_DB', 'fingerprints.db')
+        self.fingerprint_db = sqlite3.connect(self.fingerprint_db_path, check_same_thread=False)
+        self._fingerprint_lock = threading.Lock()
+        with self.fingerprint_db:
+            # Таблиця попередньої схеми (без моделі) - це лише кеш, тому видаляється
+            columns = [row[1] for row in self.fingerprint_db.execute('PRAGMA table_info(fingerprints)')]
+            if columns and 'model' not in columns:
+                self.fingerprint_db.execute('DROP TABLE fingerprints')
+                self.fingerprint_db.execute('DROP TABLE IF EXISTS fingerprint_keys')
+            
+            self.fingerprint_db.execute(
+                'CREATE TABLE IF NOT EXISTS fingerprints '
+                '(id INTEGER PRIMARY KEY, model TEXT, fingerprint BLOB, text TEXT, ts REAL)'
+            )
+            self.fingerprint_db.execute(
+                'CREATE TABLE IF NOT EXISTS fingerprint_keys (key INTEGER, id INTEGER)'
+            )
+            self.fingerprint_db.execute(
+                'CREATE INDEX IF NOT EXISTS fingerprint_keys_key ON fingerprint_keys (key, id)'
+            )
         
         # Ініціалізація клієнтів
         self.twilio_client = Client(self.twilio_account_sid, self.twilio_auth_token)
-        openai.api_key = self.openai_api_key
+        self.twilio_request_validator = RequestValidator(self.twilio_auth_token)
+        
+        # Спільний HTTP клієнт: з'єднання з api.twilio.com використовуються повторно
+        # Twilio перенаправляє запит запису на підписане сховище (Authorization туди не передається)
+        self.http = httpx.AsyncClient(
+            http2=h2 is not None,
+            auth=(self.twilio_account_sid, self.twilio_auth_token),
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+        
+        # Регіон для номерів без міжнародного коду
+        self.default_region = 'UA'
         
         # Фрази для визначення невалідних номерів
         self.invalid_phrases = [
@@ -42,135 +169,653 @@ class PhoneValidator:
             'номер заблокований', 'послуга недоступна'
         ]
         
+        # Пошук усіх фраз за один прохід: Hyperscan (SIMD), якщо доступний, інакше Ахо-Корасік
+        self.invalid_phrases_db = self._build_hyperscan_db()
+        self.invalid_phrases_automaton = None
+        if self.invalid_phrases_db is None:
+            self.invalid_phrases_automaton = self._build_phrase_automaton()
+        
+        # Визначення SIT-сигналів (три тони перед повідомленням оператора)
+        self.sit_frequencies = (985.2, 1370.6, 1776.7)  # Гц
+        self.sit_scan_seconds = 2
+        self.sit_frame_seconds = 0.05
+        self.sit_threshold = 0.5  # частка енергії кадру на частоті тону
+        
+        # Результати попередніх запусків: номер не перевіряється повторно протягом result_ttl
+        self.result_ttl = 7 * 24 * 3600  # секунди
+        self.results_db_path = os.getenv('RESULTS_DB', 'results.db')
+        self.results_db = sqlite3.connect(self.results_db_path)
+        with self.results_db:
+            self.results_db.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(phone TEXT PRIMARY KEY, status TEXT, transcribed_text TEXT, call_sid TEXT, ts REAL)'
+            )
+        self._pending_results: List[Tuple] = []  # записуються пакетами по flush_every
+        
+        # Частота дискретизації декодованого запису (зразок Whisper)
+        self.audio_sample_rate = 16000
+        
         # Пауза між дзвінками (секунди)
         self.call_delay = 2
         
         # Тривалість запису (секунди)
         self.recording_duration = 10
         
-        self._validate_credentials()
+        # Максимальне очікування завершення дзвінка (гудки + запис + запас)
+        self.call_wait_timeout = self.recording_duration * 2 + 5
+        
+        # Максимальне очікування готовності запису після завершення дзвінка
+        self.recording_wait_timeout = 10
+        
+        # Стан дзвінків з вебхуків: call_sid -> події завершення дзвінка і запису, SID запису
+        self._call_states: Dict[str, Dict] = {}
+        
+        # HTTP сервер вебхуків (запущений лише всередині webhook())
+        self._webhook_runner = None
+        
+        # Максимальна кількість одночасних дзвінків
+        self.max_concurrency = 20
+        
+        # Розміри пулів обробників конвеєра
+        self.call_workers = self.max_concurrency
+        self.download_workers = 8
+        self.transcribe_workers = 2
+        
+        # Пакетне розпізнавання: розмір пакета і максимальне очікування його заповнення (секунди)
+        self.transcribe_batch_size = 8
+        self.transcribe_batch_wait = 0.2
+        
+        # Кількість рядків результатів між примусовими записами на диск
+        self.flush_every = 50
+        
+        # Час, раніше якого не можна почати наступний дзвінок
+        self._call_lock = asyncio.Lock()
+        self._next_call_at = 0.0
     
     def _validate_credentials(self):
         """Перевірка наявності API ключів"""
         required_vars = [
             'TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 
-            'TWILIO_PHONE_NUMBER', 'OPENAI_API_KEY'
+            'TWILIO_PHONE_NUMBER', 'WEBHOOK_BASE_URL'
         ]
         
         missing_vars = [var for var in required_vars if not os.getenv(var)]
         if missing_vars:
             raise ValueError(f"Відсутні змінні середовища: {', '.join(missing_vars)}")
     
-    def read_phone_numbers(self, csv_file: str) -> List[str]:
-        """Читання номерів з CSV файлу"""
-        phones = []
+    def _load_whisper(self):
+        """Завантаження моделі Whisper і пакетного конвеєра (один раз, при першому використанні)"""
+        if self._whisper is None:
+            with self._whisper_lock:
+                if self._whisper is None:
+                    logger.info(
+                        "Завантаження моделі Whisper: %s (%s, %s)",
+                        self.whisper_model_size, self.whisper_device, self.whisper_compute_type
+                    )
+                    model = WhisperModel(
+                        self.whisper_model_size,
+                        device=self.whisper_device,
+                        compute_type=self.whisper_compute_type,
+                        cpu_threads=self.whisper_cpu_threads,
+                        num_workers=self.transcribe_workers
+                    )
+                    self._batched_whisper = BatchedInferencePipeline(model=model)
+                    self._whisper = model
+    
+    @property
+    def whisper(self) -> WhisperModel:
+        """Модель Whisper (спільна для всіх перевірок)"""
+        self._load_whisper()
+        return self._whisper
+    
+    @property
+    def batched_whisper(self) -> BatchedInferencePipeline:
+        """Пакетний конвеєр Whisper поверх спільної моделі"""
+        self._load_whisper()
+        return self._batched_whisper
+    
+    async def close(self):
+        """Закриття з'єднань і кешів"""
+        await self.http.aclose()
+        self.transcript_cache.close()
+        self.fingerprint_db.close()
+        self._flush_results()
+        self.results_db.close()
+    
+    def _read_phone_column_csv(self, csv_file: str) -> Iterator[str]:
+        """Читання колонки phone модулем csv"""
+        with open(csv_file, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                if 'phone' in row and row['phone'].strip():
+                    yield row['phone'].strip()
+    
+    def _read_phone_column_arrow(self, csv_file: str) -> Iterator[str]:
+        """Читання колонки phone через pyarrow (розбір і очищення пакетами у C++)"""
+        with open(csv_file, 'rb') as file:
+            reader = pa_csv.open_csv(
+                file,
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={'phone': pa.string()},
+                    include_columns=['phone'],
+                    include_missing_columns=True
+                )
+            )
+            for batch in reader:
+                phones = pc.utf8_trim_whitespace(batch.column('phone'))
+                # Порожні значення і null відкидаються фільтром
+                yield from phones.filter(pc.not_equal(phones, '')).to_pylist()
+    
+    def read_phone_numbers(self, csv_file: str) -> Iterator[str]:
+        """Читання номерів з CSV файлу (по одному, без завантаження всього файлу)"""
+        count = 0
         try:
-            with open(csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if 'phone' in row and row['phone'].strip():
-                        phones.append(row['phone'].strip())
+            if pa is not None:
+                phones = self._read_phone_column_arrow(csv_file)
+            else:
+                phones = self._read_phone_column_csv(csv_file)
+            
+            for phone in phones:
+                count += 1
+                yield phone
             
-            logger.info(f"Завантажено {len(phones)} номерів з {csv_file}")
-            return phones
+            logger.info("Завантажено %d номерів з %s", count, csv_file)
         
         except FileNotFoundError:
-            logger.error(f"Файл {csv_file} не знайдено")
-            return []
+            logger.error("Файл %s не знайдено", csv_file)
         except Exception as e:
-            logger.error(f"Помилка читання файлу: {e}")
-            return []
+            logger.error("Помилка читання файлу: %s", e)
+    
+    def normalize_phone(self, phone_number: str) -> str:
+        """Приведення номера до формату E.164 (невалідний номер повертається без змін)"""
+        try:
+            parsed = phonenumbers.parse(phone_number, self.default_region)
+        except phonenumbers.NumberParseException:
+            return phone_number
+        
+        # Інакше відхилений номер потрапив би у результати у вигляді, якого не було у вхідних даних
+        if not phonenumbers.is_valid_number(parsed):
+            return phone_number
+        
+        return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
     
-    def make_call_with_recording(self, phone_number: str) -> Tuple[str, str]:
+    def is_well_formed_number(self, phone_number: str) -> bool:
+        """Перевірка номера за правилами libphonenumber (без дзвінка)"""
+        try:
+            return phonenumbers.is_valid_number(phonenumbers.parse(phone_number, self.default_region))
+        except phonenumbers.NumberParseException:
+            return False
+    
+    def unique_phones(self, phones: Iterable[str]) -> Iterator[str]:
+        """Номери без повторів (порівняння у форматі E.164)"""
+        seen = set()
+        for phone in phones:
+            normalized = self.normalize_phone(phone)
+            if normalized in seen:
+                logger.info("Пропущено дублікат: %s", phone)
+                continue
+            
+            seen.add(normalized)
+            yield normalized
+    
+    def _new_call_state(self, call_sid: str) -> Dict:
+        """Стан дзвінка, на який очікує make_call_with_recording"""
+        state = {
+            'completed': asyncio.Event(),
+            'call_status': None,
+            'recorded': asyncio.Event(),
+            'recording_sid': None
+        }
+        self._call_states[call_sid] = state
+        return state
+    
+    async def _twilio_form(self, request: web.Request) -> Dict:
+        """Дані вебхука Twilio (None, якщо підпис невірний)"""
+        data = await request.post()
+        
+        signature = request.headers.get('X-Twilio-Signature', '')
+        url = f"{self.webhook_base_url}{request.path_qs}"
+        if not self.twilio_request_validator.validate(url, dict(data), signature):
+            logger.warning("Невірний підпис Twilio для %s", request.path)
+            return None
+        
+        return data
+    
+    async def _handle_call_status(self, request: web.Request) -> web.Response:
+        """Обробка статусу дзвінка від Twilio"""
+        data = await self._twilio_form(request)
+        if data is None:
+            return web.Response(status=403)
+        
+        call_sid = data.get('CallSid')
+        logger.info("Статус дзвінка %s: %s", call_sid, data.get('CallStatus'))
+        
+        # Стан існує, лише поки дзвінок очікують; пізні вебхуки не створюють нових записів
+        state = self._call_states.get(call_sid)
+        if state is not None:
+            state['call_status'] = data.get('CallStatus')
+            state['completed'].set()
+        
+        return web.Response(text='')
+    
+    async def _handle_recording_status(self, request: web.Request) -> web.Response:
+        """Обробка статусу запису від Twilio"""
+        data = await self._twilio_form(request)
+        if data is None:
+            return web.Response(status=403)
+        
+        call_sid = data.get('CallSid')
+        logger.info("Статус запису %s: %s", data.get('RecordingSid'), data.get('RecordingStatus'))
+        
+        # Запис після тайм-ауту або для неприйнятого дзвінка ніхто не очікує
+        state = self._call_states.get(call_sid)
+        if state is not None:
+            if data.get('RecordingStatus') == 'completed':
+                state['recording_sid'] = data.get('RecordingSid')
+            state['recorded'].set()
+        
+        return web.Response(text='')
+    
+    async def _start_webhook_server(self) -> web.AppRunner:
+        """Запуск HTTP сервера для вебхуків Twilio"""
+        app = web.Application()
+        app.router.add_post('/twilio/status', self._handle_call_status)
+        app.router.add_post('/twilio/recording', self._handle_recording_status)
+        
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, port=self.webhook_port).start()
+        
+        logger.info("Вебхук запущено на порту %d", self.webhook_port)
+        return runner
+    
+    @asynccontextmanager
+    async def webhook(self) -> AsyncIterator[None]:
+        """
+        Вебхук Twilio на час перевірок:
+            async with validator.webhook():
+                await validator.validate_phone_number(phone)
+        Якщо вебхук уже запущено, використовується наявний
+        """
+        if self._webhook_runner is not None:
+            yield
+            return
+        
+        self._webhook_runner = await self._start_webhook_server()
+        try:
+            yield
+        finally:
+            await self._webhook_runner.cleanup()
+            self._webhook_runner = None
+    
+    async def _wait_call_slot(self):
+        """Дотримання паузи між початком дзвінків"""
+        async with self._call_lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_call_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_call_at = loop.time() + self.call_delay
+    
+    async def make_call_with_recording(self, phone_number: str) -> Tuple[str, str]:
         """
         Здійснення дзвінка з записом
         Повертає: (call_sid, recording_sid)
         """
+        # Без вебхука завершення дзвінка і SID запису ніколи не надійдуть
+        if self._webhook_runner is None:
+            logger.error("Вебхук не запущено (потрібен validator.webhook()), дзвінок на %s скасовано", phone_number)
+            return None, None
+        
         try:
-            # TwiML для запису дзвінка
-            twiml_url = f"http://twimlets.com/holdmusic?Bucket=com.twilio.music.ambient"
+            # TwiML для запису дзвінка: тиша з нашого боку, щоб у записі був лише абонент
+            # (музика очікування змішувалась би з кожним записом і псувала відбитки)
+            twiml = f'<Response><Pause length="{self.recording_duration}"/></Response>'
+            
+            # Пауза між дзвінками
+            await self._wait_call_slot()
             
             # Здійснення дзвінка
-            call = self.twilio_client.calls.create(
+            call = await asyncio.to_thread(
+                self.twilio_client.calls.create,
                 to=phone_number,
                 from_=self.twilio_phone_number,
-                url=twiml_url,
+                twiml=twiml,
                 record=True,
                 recording_channels='mono',
-                recording_status_callback_event=['completed'],
+                recording_status_callback=f"{self.webhook_base_url}/twilio/recording",
+                recording_status_callback_event=['completed', 'absent'],
+                recording_status_callback_method='POST',
+                status_callback=f"{self.webhook_base_url}/twilio/status",
+                status_callback_event=['completed'],
+                status_callback_method='POST',
                 timeout=self.recording_duration,
-                method='GET'
+                time_limit=self.recording_duration
             )
             
-            logger.info(f"Дзвінок розпочато: {phone_number} (SID: {call.sid})")
-            
-            # Очікування завершення дзвінка
-            time.sleep(self.recording_duration + 2)
+            logger.info("Дзвінок розпочато: %s (SID: %s)", phone_number, call.sid)
             
-            # Отримання запису
-            recordings = self.twilio_client.recordings.list(call_sid=call.sid, limit=1)
-            recording_sid = recordings[0].sid if recordings else None
+            # Очікування завершення дзвінка і запису (події встановлюють вебхуки)
+            state = self._new_call_state(call.sid)
+            try:
+                await asyncio.wait_for(state['completed'].wait(), timeout=self.call_wait_timeout)
+                
+                # Запис існує лише для прийнятого дзвінка
+                if state['call_status'] == 'completed':
+                    await asyncio.wait_for(state['recorded'].wait(), timeout=self.recording_wait_timeout)
+            except asyncio.TimeoutError:
+                # Без вебхука невідомо, чи був запис - це помилка, а не ознака невалідності
+                logger.error("Не отримано статус дзвінка або запису %s", call.sid)
+                return None, None
+            finally:
+                self._call_states.pop(call.sid, None)
             
-            return call.sid, recording_sid
+            return call.sid, state['recording_sid']
             
         except TwilioRestException as e:
-            logger.error(f"Помилка Twilio для {phone_number}: {e}")
+            logger.error("Помилка Twilio для %s: %s", phone_number, e)
             return None, None
         except Exception as e:
-            logger.error(f"Загальна помилка для {phone_number}: {e}")
+            logger.error("Загальна помилка для %s: %s", phone_number, e)
             return None, None
     
-    def download_recording(self, recording_sid: str) -> str:
-        """Завантаження аудіозапису"""
+    async def download_recording(self, recording_sid: str) -> bytes:
+        """Завантаження аудіозапису в пам'ять"""
         if not recording_sid:
             return None
         
         try:
-            recording = self.twilio_client.recordings(recording_sid).fetch()
-            audio_url = f"https://api.twilio.com{recording.uri.replace('.json', '.mp3')}"
-            
-            # Завантаження файлу
-            response = requests.get(audio_url, auth=(self.twilio_account_sid, self.twilio_auth_token))
+            audio_url = (
+                f"https://api.twilio.com/2010-04-01/Accounts/{self.twilio_account_sid}"
+                f"/Recordings/{recording_sid}.mp3"
+            )
             
-            if response.status_code == 200:
-                filename = f"recording_{recording_sid}.mp3"
-                with open(filename, 'wb') as f:
-                    f.write(response.content)
+            # Потокове завантаження без тимчасового файлу
+            async with self.http.stream('GET', audio_url) as response:
+                if response.status_code != 200:
+                    logger.error("Не вдалося завантажити запис %s (HTTP %d)", recording_sid, response.status_code)
+                    return None
                 
-                logger.info(f"Запис завантажено: {filename}")
-                return filename
-            else:
-                logger.error(f"Не вдалося завантажити запис {recording_sid}")
-                return None
+                buffer = io.BytesIO()
+                async for chunk in response.aiter_bytes(65536):
+                    buffer.write(chunk)
+            
+            logger.info("Запис завантажено: %s (%d байт)", recording_sid, buffer.tell())
+            return buffer.getvalue()
                 
         except Exception as e:
-            logger.error(f"Помилка завантаження запису: {e}")
+            logger.error("Помилка завантаження запису: %s", e)
             return None
     
-    def transcribe_audio(self, audio_file: str) -> str:
-        """Розпізнавання мови через OpenAI Whisper"""
-        if not audio_file or not os.path.exists(audio_file):
-            return ""
+    def decode_recording(self, audio_bytes: bytes) -> np.ndarray:
+        """Декодування MP3 у моно float32 з частотою audio_sample_rate"""
+        try:
+            return decode_audio(io.BytesIO(audio_bytes), sampling_rate=self.audio_sample_rate)
+        except Exception as e:
+            logger.warning("Не вдалося декодувати запис: %s", e)
+            return None
+    
+    def _audio_fingerprint(self, audio: np.ndarray) -> List[int]:
+        """Акустичний відбиток перших секунд запису (chromaprint)"""
+        if acoustid is None:
+            return []
+        
+        samples = audio[:self.audio_sample_rate * self.fingerprint_seconds]
+        
+        # Майже тихі записи дають схожі відбитки незалежно від змісту
+        frame_size = self.audio_sample_rate // 10
+        frames = samples[:len(samples) // frame_size * frame_size].reshape(-1, frame_size)
+        if not len(frames) or np.mean(np.sqrt(np.mean(frames ** 2, axis=1)) > 0.01) < self.fingerprint_min_active:
+            return []
         
         try:
-            with open(audio_file, 'rb') as f:
-                transcript = openai.Audio.transcribe(
-                    model="whisper-1",
-                    file=f,
-                    language="uk"  # Українська мова
-                )
+            pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+            # acoustid читає блоки через next(), тому потрібен ітератор, а не список
+            encoded = acoustid.fingerprint(
+                self.audio_sample_rate, 1, iter([pcm]), maxlength=self.fingerprint_seconds
+            )
+            fingerprint, _ = chromaprint.decode_fingerprint(encoded)
+            return [value & 0xFFFFFFFF for value in fingerprint]
+        except Exception as e:
+            logger.warning("Не вдалося обчислити відбиток: %s", e)
+            return []
+    
+    @staticmethod
+    def _fingerprint_distance(a: List[int], b: List[int], max_offset: int = 0) -> float:
+        """Частка бітів, що відрізняються у двох відбитках (за найкращого зсуву до max_offset слів)"""
+        best = 1.0
+        for offset in range(-max_offset, max_offset + 1):
+            x, y = (a[offset:], b) if offset >= 0 else (a, b[-offset:])
+            length = min(len(x), len(y))
+            if not length:
+                continue
+            
+            diff_bits = sum((p ^ q).bit_count() for p, q in zip(x, y))
+            best = min(best, diff_bits / (length * 32))
+        return best
+    
+    def _fingerprint_keys(self, fingerprint: List[int]) -> List[int]:
+        """Ключі пошуку: старші 16 бітів перших слів відбитка
+        
+        Схожий запис знаходиться, якщо збігся хоча б один ключ - тобто при
+        помилках у частині слів або зсуві запису на кілька слів
+        """
+        return sorted({value >> 16 for value in fingerprint[:self.fingerprint_key_words]})
+    
+    def _match_fingerprint(self, fingerprint: List[int]) -> Optional[str]:
+        """Пошук схожого відбитка серед найновіших кандидатів (викликається під _fingerprint_lock)"""
+        keys = self._fingerprint_keys(fingerprint)
+        rows = self.fingerprint_db.execute(
+            'SELECT fingerprint, text FROM fingerprints WHERE id IN '
+            f'(SELECT id FROM fingerprint_keys WHERE key IN ({", ".join("?" * len(keys))})) '
+            'AND model = ? AND ts > ? ORDER BY id DESC LIMIT ?',
+            (*keys, self.transcript_model, datetime.now().timestamp() - self.fingerprint_ttl,
+             self.fingerprint_max_candidates)
+        ).fetchall()
+        
+        for blob, text in rows:
+            distance = self._fingerprint_distance(fingerprint, array('I', blob), self.fingerprint_max_offset)
+            if distance < self.fingerprint_threshold:
+                return text
+        return None
+    
+    def _find_similar_transcript(self, fingerprint: List[int]) -> Optional[str]:
+        """Пошук тексту для схожого запису за відбитком"""
+        if not fingerprint:
+            return None
+        
+        with self._fingerprint_lock:
+            return self._match_fingerprint(fingerprint)
+    
+    def _store_fingerprint(self, fingerprint: List[int], text: str):
+        """Збереження відбитка з розпізнаним текстом (лише якщо схожого ще немає)"""
+        if not fingerprint:
+            return
+        
+        now = datetime.now().timestamp()
+        with self._fingerprint_lock, self.fingerprint_db:
+            # Схожий запис міг з'явитися з іншого пакета, поки працював Whisper
+            if self._match_fingerprint(fingerprint) is not None:
+                return
             
-            text = transcript.get('text', '').lower()
-            logger.info(f"Розпізнано текст: {text[:100]}...")
+            fingerprint_id = self.fingerprint_db.execute(
+                'INSERT INTO fingerprints (model, fingerprint, text, ts) VALUES (?, ?, ?, ?)',
+                (self.transcript_model, array('I', fingerprint).tobytes(), text, now)
+            ).lastrowid
+            self.fingerprint_db.executemany(
+                'INSERT INTO fingerprint_keys (key, id) VALUES (?, ?)',
+                [(key, fingerprint_id) for key in self._fingerprint_keys(fingerprint)]
+            )
             
-            # Видалення тимчасового файлу
-            os.remove(audio_file)
+            # Видалення застарілих і найстаріших відбитків понад fingerprint_max_rows
+            # (ts зростає разом з id, тож видаляються найменші id разом з їхніми ключами)
+            self.fingerprint_db.execute(
+                'DELETE FROM fingerprints WHERE ts < ? '
+                'OR id <= (SELECT MAX(id) FROM fingerprints) - ?',
+                (now - self.fingerprint_ttl, self.fingerprint_max_rows)
+            )
+            self.fingerprint_db.execute(
+                'DELETE FROM fingerprint_keys WHERE id < (SELECT MIN(id) FROM fingerprints)'
+            )
+    
+    def _whisper_batch(self, audios: List[np.ndarray]) -> List[str]:
+        """Розпізнавання кількох записів за один прохід моделі"""
+        if len(audios) == 1:
+            segments, _ = self.whisper.transcribe(audios[0], language=self.whisper_language)
+            return [''.join(segment.text for segment in segments).strip().lower()]
+        
+        # Записи склеюються, кожен стає окремим фрагментом пакета (не довше 30 секунд)
+        clips = [audio[:self.audio_sample_rate * 30] for audio in audios]
+        starts = list(accumulate((len(clip) for clip in clips[:-1]), initial=0))
+        start_seconds = [start / self.audio_sample_rate for start in starts]
+        
+        # Межі фрагментів у секундах (faster-whisper >= 1.2 сам переводить їх у відліки)
+        clip_timestamps = [
+            {'start': start, 'end': start + len(clip) / self.audio_sample_rate}
+            for start, clip in zip(start_seconds, clips)
+        ]
+        
+        segments, _ = self.batched_whisper.transcribe(
+            np.concatenate(clips),
+            language=self.whisper_language,
+            clip_timestamps=clip_timestamps,
+            batch_size=self.transcribe_batch_size
+        )
+        
+        # Сегменти повертаються до своїх записів за часом початку
+        texts = [[] for _ in clips]
+        for segment in segments:
+            texts[bisect_right(start_seconds, segment.start + 0.01) - 1].append(segment.text)
+        
+        return [''.join(parts).strip().lower() for parts in texts]
+    
+    def transcribe_batch(self, recordings: List[Tuple[bytes, np.ndarray]]) -> List[Optional[str]]:
+        """Розпізнавання пакета записів (кеші перевіряються до запуску Whisper)
+        
+        Повертає текст для кожного запису: "" - якщо аудіо немає, None - якщо розпізнавання не вдалося
+        """
+        texts = [None] * len(recordings)
+        
+        try:
+            # Записи для Whisper: хеш -> (аудіо, відбиток, індекси однакових записів)
+            pending = {}
             
-            return text
+            for i, (audio_bytes, audio) in enumerate(recordings):
+                if not audio_bytes or audio is None or not len(audio):
+                    texts[i] = ""
+                    continue
+                
+                cache_key = f'{self.transcript_model}:{hashlib.blake2b(audio_bytes).hexdigest()}'
+                if cache_key in pending:
+                    pending[cache_key][2].append(i)
+                    continue
+                
+                # Пошук у кеші перед запуском Whisper
+                text = self.transcript_cache.get(cache_key)
+                if text is not None:
+                    logger.info("Текст взято з кешу: %.100s...", text)
+                    texts[i] = text
+                    continue
+                
+                # Пошук схожого запису за акустичним відбитком
+                fingerprint = self._audio_fingerprint(audio)
+                text = self._find_similar_transcript(fingerprint)
+                if text is not None:
+                    logger.info("Текст взято за відбитком: %.100s...", text)
+                    self.transcript_cache.set(cache_key, text, expire=self.transcript_cache_ttl)
+                    texts[i] = text
+                    continue
+                
+                pending[cache_key] = (audio, fingerprint, [i])
             
+            if pending:
+                whispered = self._whisper_batch([audio for audio, _, _ in pending.values()])
+                
+                for (cache_key, (_, fingerprint, indices)), text in zip(pending.items(), whispered):
+                    self._store_fingerprint(fingerprint, text)
+                    self.transcript_cache.set(cache_key, text, expire=self.transcript_cache_ttl)
+                    logger.info("Розпізнано текст: %.100s...", text)
+                    
+                    for i in indices:
+                        texts[i] = text
+        
+        except Exception as e:
+            logger.error("Помилка розпізнавання: %s", e)
+        
+        return texts
+    
+    def transcribe_audio(self, audio_bytes: bytes, audio: np.ndarray) -> Optional[str]:
+        """Розпізнавання мови локальною моделлю Whisper"""
+        return self.transcribe_batch([(audio_bytes, audio)])[0]
+    
+    def _build_hyperscan_db(self):
+        """Компіляція фраз невалідності у базу Hyperscan"""
+        if hyperscan is None:
+            return None
+        
+        flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SINGLEMATCH
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[re.escape(phrase).encode('utf-8') for phrase in self.invalid_phrases],
+                ids=list(range(len(self.invalid_phrases))),
+                elements=len(self.invalid_phrases),
+                flags=[flags] * len(self.invalid_phrases)
+            )
+            return db
         except Exception as e:
-            logger.error(f"Помилка розпізнавання: {e}")
-            return ""
+            logger.warning("Не вдалося скомпілювати фрази для Hyperscan: %s", e)
+            return None
+    
+    def _build_phrase_automaton(self) -> ahocorasick.Automaton:
+        """Автомат Ахо-Корасік для фраз невалідності"""
+        automaton = ahocorasick.Automaton()
+        for phrase in self.invalid_phrases:
+            automaton.add_word(phrase, phrase)
+        automaton.make_automaton()
+        return automaton
+    
+    def _contains_invalid_phrase(self, text_lower: str) -> bool:
+        """Чи містить текст хоча б одну фразу невалідності"""
+        if self.invalid_phrases_db is None:
+            return next(self.invalid_phrases_automaton.iter(text_lower), None) is not None
+        
+        matches = []
+        self.invalid_phrases_db.scan(
+            text_lower.encode('utf-8'),
+            match_event_handler=lambda phrase_id, start, end, flags, context: matches.append(phrase_id)
+        )
+        return bool(matches)
+    
+    def has_sit_tone(self, audio: np.ndarray) -> bool:
+        """Пошук SIT-сигналу на початку запису (фільтр Герцеля)"""
+        # Розбиття початку запису на кадри
+        samples = audio[:int(self.audio_sample_rate * self.sit_scan_seconds)].astype(np.float64)
+        frame_size = int(self.audio_sample_rate * self.sit_frame_seconds)
+        frame_count = len(samples) // frame_size
+        if not frame_count:
+            return False
+        
+        frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size)
+        energy = np.maximum(np.sum(frames ** 2, axis=1), 1e-12)
+        
+        # Відносна потужність кожного тону в кожному кадрі (результат фільтра Герцеля)
+        n = np.arange(frame_size)
+        ratios = np.stack([
+            2 * np.abs(frames @ np.exp(-2j * np.pi * freq * n / self.audio_sample_rate)) ** 2
+            / (frame_size * energy)
+            for freq in self.sit_frequencies
+        ])
+        
+        tones = np.where(ratios.max(axis=0) > self.sit_threshold, ratios.argmax(axis=0), -1)
+        
+        # Тони SIT звучать послідовно за зростанням частоти, кожен довше одного кадру
+        sequence = []
+        for tone, run in groupby(tones.tolist()):
+            if tone >= 0 and len(list(run)) > 1 and (not sequence or tone > sequence[-1]):
+                sequence.append(tone)
+        
+        return len(sequence) >= 2
     
     def is_valid_number(self, transcribed_text: str) -> bool:
         """Перевірка валідності номера на основі розпізнаного тексту"""
@@ -180,9 +825,8 @@ class PhoneValidator:
         text_lower = transcribed_text.lower()
         
         # Перевірка на наявність фраз невалідності
-        for phrase in self.invalid_phrases:
-            if phrase in text_lower:
-                return False
+        if self._contains_invalid_phrase(text_lower):
+            return False
         
         # Якщо текст занадто короткий (менше 3 символів), вважаємо невалідним
         if len(transcribed_text.strip()) < 3:
@@ -190,85 +834,253 @@ class PhoneValidator:
         
         return True
     
-    def validate_phone_number(self, phone_number: str) -> Dict:
-        """Повна перевірка одного номера"""
-        logger.info(f"Перевірка номера: {phone_number}")
-        
-        # Здійснення дзвінка
-        call_sid, recording_sid = self.make_call_with_recording(phone_number)
-        
-        if not call_sid:
-            return {
-                'phone': phone_number,
-                'status': 'ERROR',
-                'transcribed_text': 'Помилка дзвінка',
-                'call_sid': None,
-                'timestamp': datetime.now().isoformat()
-            }
-        
-        # Завантаження запису
-        audio_file = self.download_recording(recording_sid)
-        
-        # Розпізнавання тексту
-        transcribed_text = self.transcribe_audio(audio_file) if audio_file else ""
-        
-        # Визначення валідності
-        is_valid = self.is_valid_number(transcribed_text)
-        status = 'VALID' if is_valid else 'INVALID'
-        
-        result = {
+    def _make_result(self, phone_number: str, status: str, transcribed_text: str, call_sid: str) -> Dict:
+        """Рядок результату перевірки"""
+        return {
             'phone': phone_number,
             'status': status,
             'transcribed_text': transcribed_text,
             'call_sid': call_sid,
             'timestamp': datetime.now().isoformat()
         }
+    
+    def _cached_result(self, phone_number: str) -> Dict:
+        """Результат попередньої перевірки номера, не старший за result_ttl"""
+        row = self.results_db.execute(
+            'SELECT status, transcribed_text, call_sid, ts FROM results WHERE phone = ? AND ts > ?',
+            (phone_number, datetime.now().timestamp() - self.result_ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        status, transcribed_text, call_sid, ts = row
+        return {
+            'phone': phone_number,
+            'status': status,
+            'transcribed_text': transcribed_text,
+            'call_sid': call_sid,
+            'timestamp': datetime.fromtimestamp(ts).isoformat()
+        }
+    
+    def _flush_results(self):
+        """Запис накопичених результатів у базу однією транзакцією"""
+        if not self._pending_results:
+            return
         
-        logger.info(f"Результат для {phone_number}: {status}")
+        with self.results_db:
+            self.results_db.executemany(
+                'INSERT OR REPLACE INTO results (phone, status, transcribed_text, call_sid, ts) '
+                'VALUES (?, ?, ?, ?, ?)',
+                self._pending_results
+            )
+        self._pending_results.clear()
+    
+    def _remember_result(self, result: Dict):
+        """Збереження результату для наступних запусків"""
+        self._pending_results.append((
+            result['phone'], result['status'], result['transcribed_text'], result['call_sid'],
+            datetime.fromisoformat(result['timestamp']).timestamp()
+        ))
+        if len(self._pending_results) >= self.flush_every:
+            self._flush_results()
+    
+    def _finish(self, job: Dict, transcribed_text: Optional[str], is_valid: bool) -> Dict:
+        """Завершення перевірки номера"""
+        if transcribed_text is None:
+            logger.info("Результат для %s: ERROR (помилка розпізнавання)", job['phone'])
+            return self._make_result(job['phone'], 'ERROR', 'Помилка розпізнавання', job['call_sid'])
+        
+        status = 'VALID' if is_valid else 'INVALID'
+        logger.info("Результат для %s: %s", job['phone'], status)
+        
+        result = self._make_result(job['phone'], status, transcribed_text, job['call_sid'])
+        
+        # Зберігається лише вердикт з доказом (SIT-сигнал або розпізнаний текст);
+        # без запису чи аудіо (зайнято, не відповів) номер перевіряється знову наступного разу
+        if transcribed_text:
+            self._remember_result(result)
         return result
     
-    def process_phone_list(self, input_csv: str, output_csv: str):
-        """Обробка списку номерів"""
-        phones = self.read_phone_numbers(input_csv)
+    async def _call_stage(self, phone_number: str) -> Dict:
+        """Етап 1: дзвінок і очікування запису"""
+        logger.info("Перевірка номера: %s", phone_number)
+        
+        # Номер з невірним кодом, довжиною чи префіксом відхиляється без дзвінка
+        if not self.is_well_formed_number(phone_number):
+            logger.info("Результат для %s: INVALID (некоректний формат)", phone_number)
+            return self._make_result(phone_number, 'INVALID', 'Некоректний формат номера', None)
         
-        if not phones:
+        # Номер, перевірений нещодавно, не потребує нового дзвінка
+        cached = self._cached_result(phone_number)
+        if cached is not None:
+            logger.info("Результат для %s: %s (з попередньої перевірки)", phone_number, cached['status'])
+            return cached
+        
+        call_sid, recording_sid = await self.make_call_with_recording(phone_number)
+        
+        if not call_sid:
+            return self._make_result(phone_number, 'ERROR', 'Помилка дзвінка', None)
+        
+        return {'phone': phone_number, 'call_sid': call_sid, 'recording_sid': recording_sid}
+    
+    async def _download_stage(self, job: Dict) -> Dict:
+        """Етап 2: завантаження запису і пошук SIT-сигналу"""
+        audio_bytes = await self.download_recording(job['recording_sid'])
+        audio = await asyncio.to_thread(self.decode_recording, audio_bytes) if audio_bytes else None
+        
+        # Запис існує, але його не вдалося отримати - це помилка, а не ознака невалідності
+        if job['recording_sid'] and audio is None:
+            logger.info("Результат для %s: ERROR (помилка завантаження запису)", job['phone'])
+            return self._make_result(job['phone'], 'ERROR', 'Помилка завантаження запису', job['call_sid'])
+        
+        if audio is not None and await asyncio.to_thread(self.has_sit_tone, audio):
+            # SIT-сигнал - номер недоступний, розпізнавання не потрібне
+            logger.info("Виявлено SIT-сигнал: %s", job['phone'])
+            return self._finish(job, 'SIT-сигнал оператора', False)
+        
+        job['audio_bytes'] = audio_bytes
+        job['audio'] = audio
+        return job
+    
+    async def _transcribe_stage(self, job: Dict) -> Dict:
+        """Етап 3: розпізнавання тексту і визначення валідності"""
+        transcribed_text = await asyncio.to_thread(self.transcribe_audio, job['audio_bytes'], job['audio'])
+        
+        return self._finish(job, transcribed_text, self.is_valid_number(transcribed_text or ""))
+    
+    async def _transcribe_batch_stage(self, jobs: List[Dict]) -> List[Dict]:
+        """Етап 3 для пакета записів"""
+        texts = await asyncio.to_thread(
+            self.transcribe_batch, [(job['audio_bytes'], job['audio']) for job in jobs]
+        )
+        
+        return [
+            self._finish(job, text, self.is_valid_number(text or "")) for job, text in zip(jobs, texts)
+        ]
+    
+    async def validate_phone_number(self, phone_number: str) -> Dict:
+        """Повна перевірка одного номера"""
+        job = await self._call_stage(phone_number)
+        
+        # Перевірка завершена, щойно з'явився статус
+        for stage in (self._download_stage, self._transcribe_stage):
+            if 'status' in job:
+                break
+            job = await stage(job)
+        
+        return job
+    
+    async def process_phone_list(self, input_csv: str, output_csv: str):
+        """Обробка списку номерів (конвеєр: дзвінок -> завантаження -> розпізнавання)"""
+        phones = self.unique_phones(self.read_phone_numbers(input_csv))
+        
+        first_phone = next(phones, None)
+        if first_phone is None:
             logger.error("Немає номерів для обробки")
             return
         
-        results = []
+        phones = chain([first_phone], phones)
+        stats = Counter()
         
         # Створення заголовків для вихідного файлу
         fieldnames = ['phone', 'status', 'transcribed_text', 'call_sid', 'timestamp']
         
-        with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for i, phone in enumerate(phones, 1):
-                logger.info(f"Обробка {i}/{len(phones)}: {phone}")
+        # Черги етапів обмежені: номери читаються по мірі потреби, а повільний Whisper
+        # зупиняє завантаження і дзвінки замість накопичення записів у пам'яті
+        call_q = asyncio.Queue(maxsize=self.call_workers)
+        download_q = asyncio.Queue(maxsize=self.download_workers * 2)
+        transcribe_q = asyncio.Queue(maxsize=self.transcribe_batch_size * self.transcribe_workers * 2)
+        result_q = asyncio.Queue()
+        
+        async def stage_worker(stage, inbox: asyncio.Queue, outbox: asyncio.Queue):
+            while True:
+                item = await inbox.get()
+                try:
+                    job = await stage(item)
+                except Exception as e:
+                    phone = item if isinstance(item, str) else item['phone']
+                    logger.error("Помилка обробки %s: %s", phone, e)
+                    job = self._make_result(phone, 'ERROR', 'Помилка обробки', None)
                 
-                result = self.validate_phone_number(phone)
-                results.append(result)
+                # Завершені перевірки одразу потрапляють до результатів
+                await (result_q if 'status' in job else outbox).put(job)
+                inbox.task_done()
+        
+        async def transcribe_worker():
+            loop = asyncio.get_running_loop()
+            while True:
+                # Збір пакета: до transcribe_batch_size записів або до transcribe_batch_wait секунд
+                jobs = [await transcribe_q.get()]
+                deadline = loop.time() + self.transcribe_batch_wait
+                while len(jobs) < self.transcribe_batch_size:
+                    try:
+                        jobs.append(await asyncio.wait_for(transcribe_q.get(), deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        break
                 
-                # Запис результату відразу
-                writer.writerow(result)
-                csvfile.flush()  # Примусовий запис на диск
+                try:
+                    finished = await self._transcribe_batch_stage(jobs)
+                except Exception as e:
+                    logger.error("Помилка розпізнавання пакета: %s", e)
+                    finished = [
+                        self._make_result(job['phone'], 'ERROR', 'Помилка обробки', job['call_sid'])
+                        for job in jobs
+                    ]
                 
-                # Пауза між дзвінками
-                if i < len(phones):
-                    logger.info(f"Пауза {self.call_delay} секунд...")
-                    time.sleep(self.call_delay)
+                for result in finished:
+                    await result_q.put(result)
+                    transcribe_q.task_done()
+        
+        # Вебхук для отримання статусів дзвінків (якщо його ще не запустив викликач)
+        async with self.webhook():
+            try:
+                with open(output_csv, 'w', newline='', encoding='utf-8', buffering=1 << 16) as csvfile:
+                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                    writer.writeheader()
+                    
+                    async def result_writer():
+                        while True:
+                            result = await result_q.get()
+                            writer.writerow(result)
+                            stats[result['status']] += 1
+                            
+                            # Примусовий запис на диск кожні flush_every рядків
+                            if stats.total() % self.flush_every == 0:
+                                csvfile.flush()
+                            result_q.task_done()
+                    
+                    # Група задач скасовує всі обробники, якщо обробка перервана
+                    async with asyncio.TaskGroup() as tg:
+                        workers = [
+                            tg.create_task(stage_worker(self._call_stage, call_q, download_q))
+                            for _ in range(self.call_workers)
+                        ] + [
+                            tg.create_task(stage_worker(self._download_stage, download_q, transcribe_q))
+                            for _ in range(self.download_workers)
+                        ] + [
+                            tg.create_task(transcribe_worker()) for _ in range(self.transcribe_workers)
+                        ] + [tg.create_task(result_writer())]
+                        
+                        for i, phone in enumerate(phones, 1):
+                            logger.info("Обробка %d: %s", i, phone)
+                            await call_q.put(phone)
+                        
+                        # Очікування проходження всіх номерів через етапи по черзі
+                        for stage_q in (call_q, download_q, transcribe_q, result_q):
+                            await stage_q.join()
+                        
+                        # Усі номери оброблено, обробники більше не потрібні
+                        for worker in workers:
+                            worker.cancel()
+            finally:
+                self._flush_results()
         
         # Статистика
-        valid_count = sum(1 for r in results if r['status'] == 'VALID')
-        invalid_count = sum(1 for r in results if r['status'] == 'INVALID')
-        error_count = sum(1 for r in results if r['status'] == 'ERROR')
-        
-        logger.info(f"Обробка завершена:")
-        logger.info(f"Валідні: {valid_count}")
-        logger.info(f"Невалідні: {invalid_count}")
-        logger.info(f"Помилки: {error_count}")
-        logger.info(f"Результати збережено у {output_csv}")
+        logger.info("Обробка завершена:")
+        logger.info("Валідні: %d", stats['VALID'])
+        logger.info("Невалідні: %d", stats['INVALID'])
+        logger.info("Помилки: %d", stats['ERROR'])
+        logger.info("Результати збережено у %s", output_csv)
 
 def main():
     """Головна функція"""
@@ -279,7 +1091,16 @@ def main():
     output_file = f"validation_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     
     # Запуск обробки
-    validator.process_phone_list(input_file, output_file)
+    async def run():
+        try:
+            await validator.process_phone_list(input_file, output_file)
+        finally:
+            await validator.close()
+    
+    # Цикл подій uvloop (libuv), якщо встановлений
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(run())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,25 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'phone.validator.ai.py'
+
+
+@pytest.fixture
+def validator(tmp_path, monkeypatch):
+    """PhoneValidator з фейковими обліковими даними у тимчасовому каталозі"""
+    monkeypatch.chdir(tmp_path)
+    for var in ('TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TWILIO_PHONE_NUMBER'):
+        monkeypatch.setenv(var, 'test')
+    monkeypatch.setenv('WEBHOOK_BASE_URL', 'https://example.com')
+
+    spec = importlib.util.spec_from_file_location('phone_validator', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    instance = module.PhoneValidator()
+    yield instance
+    instance.transcript_cache.close()
+    instance.fingerprint_db.close()
+    instance.results_db.close()
@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+STORAGE_URL = 'https://storage.example.com/RE123.mp3'
+
+
+def _twilio_transport(requests):
+    """Twilio відповідає перенаправленням на підписане сховище"""
+    def handler(request):
+        requests.append(request)
+        if request.url.host == 'api.twilio.com':
+            return httpx.Response(302, headers={'Location': STORAGE_URL})
+        return httpx.Response(200, content=b'mp3 data')
+
+    return httpx.MockTransport(handler)
+
+
+def test_download_follows_redirect_without_credentials(validator, monkeypatch):
+    requests = []
+    monkeypatch.setattr(validator.http, '_transport', _twilio_transport(requests))
+
+    async def run():
+        try:
+            return await validator.download_recording('RE123')
+        finally:
+            await validator.http.aclose()
+
+    assert asyncio.run(run()) == b'mp3 data'
+    assert [request.url.host for request in requests] == ['api.twilio.com', 'storage.example.com']
+    assert 'authorization' in requests[0].headers
+    assert 'authorization' not in requests[1].headers
+
+
+def test_failed_download_is_an_error(validator, monkeypatch):
+    async def no_recording(recording_sid):
+        return None
+
+    monkeypatch.setattr(validator, 'download_recording', no_recording)
+
+    job = {'phone': '+380671234567', 'call_sid': 'CA123', 'recording_sid': 'RE123'}
+    result = asyncio.run(validator._download_stage(job))
+
+    assert result['status'] == 'ERROR'
+    assert validator._cached_result('+380671234567') is None
+
+
+def test_call_without_recording_goes_on(validator, monkeypatch):
+    async def no_recording(recording_sid):
+        assert recording_sid is None
+        return None
+
+    monkeypatch.setattr(validator, 'download_recording', no_recording)
+
+    job = {'phone': '+380671234567', 'call_sid': 'CA123', 'recording_sid': None}
+    result = asyncio.run(validator._download_stage(job))
+
+    assert 'status' not in result
+    assert result['audio'] is None
@@ -0,0 +1,193 @@
+import random
+import sqlite3
+from types import SimpleNamespace
+
+import acoustid
+import numpy as np
+
+
+def _fingerprint(seed, length=32):
+    rng = random.Random(seed)
+    return [0x12345678] + [rng.getrandbits(32) for _ in range(length - 1)]
+
+
+def _with_flipped_bits(fingerprint, count):
+    # Один біт у кожному з перших count слів, крім префікса
+    return fingerprint[:1] + [
+        value ^ 1 if i < count else value for i, value in enumerate(fingerprint[1:])
+    ]
+
+
+def _with_random_bit_errors(fingerprint, seed):
+    # По одному біту в довільній позиції кожного слова (~3% бітів), включно зі старшими
+    rng = random.Random(seed)
+    return [value ^ (1 << rng.randrange(32)) for value in fingerprint]
+
+
+def _row_count(validator):
+    return validator.fingerprint_db.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+
+
+def test_near_duplicate_is_matched_and_not_stored_again(validator):
+    original = _fingerprint(1)
+    validator._store_fingerprint(original, 'номер не обслуговується')
+
+    similar = _with_flipped_bits(original, 10)
+    assert validator._find_similar_transcript(similar) == 'номер не обслуговується'
+
+    validator._store_fingerprint(similar, 'номер не обслуговується')
+    assert _row_count(validator) == 1
+
+    assert validator._find_similar_transcript(_fingerprint(2)) is None
+
+
+def test_first_word_error_is_matched(validator):
+    original = _fingerprint(1)
+    validator._store_fingerprint(original, 'номер не обслуговується')
+
+    corrupted = [original[0] ^ 0x80000000] + original[1:]
+    assert validator._find_similar_transcript(corrupted) == 'номер не обслуговується'
+
+
+def test_shifted_recording_is_matched(validator):
+    original = _fingerprint(1, length=40)
+    validator._store_fingerprint(original[:32], 'абонент поза зоною')
+
+    # Та сама фраза, але запис почався на одне чи три слова пізніше або раніше
+    assert validator._find_similar_transcript(original[1:33]) == 'абонент поза зоною'
+    assert validator._find_similar_transcript(original[3:35]) == 'абонент поза зоною'
+    assert validator._find_similar_transcript([0xCAFEBABE] + original[:31]) == 'абонент поза зоною'
+
+
+def test_scattered_bit_errors_are_matched(validator):
+    for seed in range(10):
+        validator._store_fingerprint(_fingerprint(seed + 100), f'текст {seed}')
+
+    for seed in range(10):
+        noisy = _with_random_bit_errors(_fingerprint(seed + 100), seed)
+        assert validator._find_similar_transcript(noisy) == f'текст {seed}'
+
+
+def test_evicted_fingerprints_leave_no_keys(validator):
+    validator.fingerprint_max_rows = 3
+    for seed in range(10):
+        validator._store_fingerprint(_fingerprint(seed + 100), f'текст {seed}')
+
+    ids = {row[0] for row in validator.fingerprint_db.execute('SELECT id FROM fingerprints')}
+    key_ids = {row[0] for row in validator.fingerprint_db.execute('SELECT id FROM fingerprint_keys')}
+    assert key_ids == ids and len(ids) == 3
+
+
+def test_table_is_capped(validator):
+    validator.fingerprint_max_rows = 5
+    for seed in range(20):
+        validator._store_fingerprint(_fingerprint(seed), f'текст {seed}')
+
+    assert _row_count(validator) == 5
+    assert validator._find_similar_transcript(_fingerprint(19)) == 'текст 19'
+    assert validator._find_similar_transcript(_fingerprint(0)) is None
+
+
+def test_lookup_scans_only_newest_candidates(validator):
+    validator.fingerprint_max_candidates = 3
+    for seed in range(10):
+        validator._store_fingerprint(_fingerprint(seed), f'текст {seed}')
+
+    assert validator._find_similar_transcript(_fingerprint(9)) == 'текст 9'
+    assert validator._find_similar_transcript(_fingerprint(5)) is None
+
+
+class FakeFingerprinter:
+    """Імітація chromaprint.Fingerprinter: відбиток - це перші слова отриманого PCM"""
+
+    def start(self, sample_rate, channels):
+        self.pcm = b''
+
+    def feed(self, block):
+        self.pcm += block
+
+    def finish(self):
+        return self.pcm
+
+
+def _fake_chromaprint(fed):
+    def decode_fingerprint(encoded):
+        fed.append(len(encoded))
+        return np.frombuffer(encoded[:256], dtype=np.int32).tolist(), 1
+
+    return SimpleNamespace(
+        Fingerprinter=FakeFingerprinter,
+        FingerprintError=RuntimeError,
+        decode_fingerprint=decode_fingerprint
+    )
+
+
+def _use_chromaprint(validator, monkeypatch):
+    """Справжній acoustid.fingerprint поверх фейкової libchromaprint"""
+    fed = []
+    fake = _fake_chromaprint(fed)
+    monkeypatch.setattr(acoustid, 'chromaprint', fake, raising=False)
+    monkeypatch.setitem(validator._audio_fingerprint.__globals__, 'acoustid', acoustid)
+    monkeypatch.setitem(validator._audio_fingerprint.__globals__, 'chromaprint', fake)
+    return fed
+
+
+def _tone(validator, seconds=6, freq=440.0, amplitude=0.5):
+    t = np.arange(int(validator.audio_sample_rate * seconds)) / validator.audio_sample_rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_audio_fingerprint_feeds_first_seconds_to_chromaprint(validator, monkeypatch):
+    fed = _use_chromaprint(validator, monkeypatch)
+
+    fingerprint = validator._audio_fingerprint(_tone(validator))
+
+    assert fingerprint and all(0 <= value <= 0xFFFFFFFF for value in fingerprint)
+    assert fed == [validator.audio_sample_rate * validator.fingerprint_seconds * 2]
+
+
+def test_audio_fingerprint_skips_silence(validator, monkeypatch):
+    fed = _use_chromaprint(validator, monkeypatch)
+
+    assert validator._audio_fingerprint(np.zeros(validator.audio_sample_rate * 6, dtype=np.float32)) == []
+    assert fed == []
+
+
+def test_similar_recording_reuses_transcript(validator, monkeypatch):
+    _use_chromaprint(validator, monkeypatch)
+    whispered = []
+
+    def fake_whisper_batch(audios):
+        whispered.extend(audios)
+        return ['номер не обслуговується'] * len(audios)
+
+    monkeypatch.setattr(validator, '_whisper_batch', fake_whisper_batch)
+
+    audio = _tone(validator)
+    assert validator.transcribe_audio(b'mp3 1', audio) == 'номер не обслуговується'
+
+    # Інший файл (інший хеш) з тим самим початком - текст береться за відбитком
+    assert validator.transcribe_audio(b'mp3 2', audio) == 'номер не обслуговується'
+    assert len(whispered) == 1
+
+
+def test_old_prefix_table_is_replaced(validator, tmp_path, monkeypatch):
+    old_dir = tmp_path / 'old'
+    old_dir.mkdir()
+    monkeypatch.chdir(old_dir)
+
+    db = sqlite3.connect('fingerprints.db')
+    with db:
+        db.execute('CREATE TABLE fingerprints (prefix INTEGER, fingerprint BLOB, text TEXT, ts REAL)')
+        db.execute("INSERT INTO fingerprints VALUES (1, x'00000000', 'старий', 0)")
+    db.close()
+
+    upgraded = type(validator)()
+    try:
+        upgraded._store_fingerprint(_fingerprint(1), 'новий')
+        assert upgraded._find_similar_transcript(_fingerprint(1)) == 'новий'
+        assert _row_count(upgraded) == 1
+    finally:
+        upgraded.transcript_cache.close()
+        upgraded.fingerprint_db.close()
+        upgraded.results_db.close()
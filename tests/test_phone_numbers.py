@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+
+
+def test_formats_of_one_number_are_deduplicated(validator):
+    phones = ['+380 67 123 45 67', '380 67 123 45 67', '067 123 4567', '+380671234567', '(067) 123-45-67']
+
+    assert list(validator.unique_phones(phones)) == ['+380671234567']
+
+
+def test_distinct_numbers_keep_their_order(validator):
+    phones = ['0671234567', '+380501112233', '+380671234567', '050 111 22 33', '+48 601 234 567']
+
+    assert list(validator.unique_phones(phones)) == ['+380671234567', '+380501112233', '+48601234567']
+
+
+def test_unparseable_number_is_kept_as_is(validator):
+    assert list(validator.unique_phones(['abc', 'abc', '0671234567'])) == ['abc', '+380671234567']
+
+    # Розбирається, але невалідний - у результатах лишається вхідне значення
+    assert validator.normalize_phone('12') == '12'
+    assert list(validator.unique_phones(['12', '067 123 45', '12'])) == ['12', '067 123 45']
+
+
+def test_well_formed_numbers(validator):
+    for phone in ('+380671234567', '0671234567', '+380441234567', '+48601234567'):
+        assert validator.is_well_formed_number(phone), phone
+
+
+def test_malformed_numbers(validator):
+    for phone in ('+38067123456', '+3806712345678', '+380001234567', '+999123456789', 'abc', ''):
+        assert not validator.is_well_formed_number(phone), phone
+
+
+class FailingCalls:
+    def create(self, **kwargs):
+        raise AssertionError('дзвінок на некоректний номер')
+
+
+def test_malformed_number_is_rejected_without_call(validator):
+    validator.twilio_client = SimpleNamespace(calls=FailingCalls())
+
+    result = asyncio.run(validator._call_stage('+38067123456'))
+
+    assert result['status'] == 'INVALID'
+    assert result['call_sid'] is None
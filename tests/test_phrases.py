@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.fixture(params=['hyperscan', 'ahocorasick'])
+def matcher(request, validator):
+    """PhoneValidator з пошуком фраз через кожен із рушіїв"""
+    if request.param == 'hyperscan':
+        if validator.invalid_phrases_db is None:
+            pytest.skip('Hyperscan не встановлений')
+    else:
+        validator.invalid_phrases_db = None
+        validator.invalid_phrases_automaton = validator._build_phrase_automaton()
+    return validator
+
+
+@pytest.mark.parametrize('text', [
+    'номер не обслуговується',
+    'вибачте, абонент тимчасово недоступний, спробуйте пізніше',
+    'НЕВІРНО НАБРАНИЙ НОМЕР',
+    'Абонент Відсутній або поза зоною досяжності',
+    'такого номера не існує.',
+])
+def test_invalid_phrase_is_found(matcher, text):
+    assert matcher._contains_invalid_phrase(text.lower())
+    assert not matcher.is_valid_number(text)
+
+
+@pytest.mark.parametrize('text', [
+    'алло, слухаю вас',
+    'доброго дня, номер доступний',
+    'зараз не можу говорити',
+])
+def test_ordinary_speech_is_valid(matcher, text):
+    assert not matcher._contains_invalid_phrase(text.lower())
+    assert matcher.is_valid_number(text)
+
+
+def test_short_or_empty_text_is_invalid(matcher):
+    assert not matcher.is_valid_number('')
+    assert not matcher.is_valid_number(' а ')
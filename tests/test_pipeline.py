@@ -0,0 +1,49 @@
+import asyncio
+import csv
+
+
+def test_slow_transcription_bounds_downloaded_jobs(validator, tmp_path, monkeypatch):
+    phones = [f'+38067{i:07d}' for i in range(300)]
+    input_csv = tmp_path / 'phones.csv'
+    input_csv.write_text('phone\n' + '\n'.join(phones) + '\n', encoding='utf-8')
+    output_csv = tmp_path / 'results.csv'
+
+    validator.webhook_port = 0
+    validator.call_delay = 0
+    in_flight = 0
+    peak = 0
+
+    async def call_stage(phone):
+        return {'phone': phone, 'call_sid': 'CA' + phone[1:], 'recording_sid': None}
+
+    async def download_stage(job):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        job['audio_bytes'] = job['audio'] = None
+        return job
+
+    async def transcribe_batch_stage(jobs):
+        nonlocal in_flight
+        await asyncio.sleep(0.01)  # повільний Whisper
+        in_flight -= len(jobs)
+        return [validator._finish(job, 'алло', True) for job in jobs]
+
+    monkeypatch.setattr(validator, '_call_stage', call_stage)
+    monkeypatch.setattr(validator, '_download_stage', download_stage)
+    monkeypatch.setattr(validator, '_transcribe_batch_stage', transcribe_batch_stage)
+
+    async def run():
+        try:
+            await validator.process_phone_list(str(input_csv), str(output_csv))
+        finally:
+            await validator.http.aclose()
+
+    asyncio.run(run())
+
+    with open(output_csv, encoding='utf-8') as file:
+        assert sorted(row['phone'] for row in csv.DictReader(file)) == phones
+
+    # Черга розпізнавання, пакети в роботі і завантажувачі, що чекають на місце в черзі
+    batch_capacity = validator.transcribe_batch_size * validator.transcribe_workers
+    assert peak <= batch_capacity * 2 + batch_capacity + validator.download_workers
@@ -0,0 +1,58 @@
+import pytest
+
+CSV = (
+    'name,phone,note\n'
+    'a,  +380671111111  ,x\n'
+    'b,,y\n'
+    'c,   ,z\n'
+    'd,NA,w\n'
+    'e,"\t0671112233 ",q\n'
+    'f,null,\n'
+)
+
+
+@pytest.fixture
+def readers(validator):
+    if validator.read_phone_numbers.__globals__['pa'] is None:
+        pytest.skip('pyarrow не встановлений')
+    return validator._read_phone_column_arrow, validator._read_phone_column_csv
+
+
+def _write(tmp_path, text):
+    path = tmp_path / 'phones.csv'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_readers_agree_on_whitespace_and_empty_values(readers, tmp_path):
+    path = _write(tmp_path, CSV)
+    arrow, plain = readers
+
+    # Порожні значення відкидаються, рядки на зразок NA - ні (це не номер, але й не пропуск)
+    assert list(arrow(path)) == list(plain(path)) == ['+380671111111', 'NA', '0671112233', 'null']
+
+
+def test_readers_agree_without_phone_column(readers, tmp_path):
+    path = _write(tmp_path, 'name\na\nb\n')
+    arrow, plain = readers
+
+    assert list(arrow(path)) == list(plain(path)) == []
+
+
+def test_readers_agree_across_batches(readers, tmp_path):
+    phones = [f'+38067{i:07d}' for i in range(100000)]
+    path = _write(tmp_path, 'phone\n' + ''.join(f' {phone}\n' for phone in phones))
+    arrow, plain = readers
+
+    assert list(arrow(path)) == list(plain(path)) == phones
+
+
+def test_csv_module_is_used_without_pyarrow(validator, tmp_path, monkeypatch):
+    path = _write(tmp_path, CSV)
+    monkeypatch.setitem(validator.read_phone_numbers.__globals__, 'pa', None)
+
+    assert list(validator.read_phone_numbers(path)) == ['+380671111111', 'NA', '0671112233', 'null']
+
+
+def test_missing_file_yields_nothing(validator, tmp_path):
+    assert list(validator.read_phone_numbers(str(tmp_path / 'absent.csv'))) == []
@@ -0,0 +1,41 @@
+def _job(phone):
+    return {'phone': phone, 'call_sid': 'CA' + phone[1:]}
+
+
+def test_only_verdicts_with_evidence_are_remembered(validator):
+    validator._finish(_job('+380671111111'), 'номер не обслуговується', False)
+    validator._finish(_job('+380672222222'), 'SIT-сигнал оператора', False)
+    validator._finish(_job('+380673333333'), '', False)  # немає запису чи аудіо
+    failed = validator._finish(_job('+380674444444'), None, False)  # помилка розпізнавання
+    validator._flush_results()
+
+    assert failed['status'] == 'ERROR'
+    assert validator._cached_result('+380671111111')['status'] == 'INVALID'
+    assert validator._cached_result('+380672222222')['status'] == 'INVALID'
+    assert validator._cached_result('+380673333333') is None
+    assert validator._cached_result('+380674444444') is None
+
+
+def test_results_are_written_in_batches(validator):
+    validator.flush_every = 3
+    for i in range(2):
+        validator._finish(_job(f'+38067000000{i}'), 'алло', True)
+    assert validator._cached_result('+380670000000') is None
+
+    validator._finish(_job('+380670000002'), 'алло', True)
+    assert validator._cached_result('+380670000000')['status'] == 'VALID'
+
+
+def test_storage_paths_can_be_overridden(validator, tmp_path, monkeypatch):
+    state_dir = tmp_path / 'state'
+    state_dir.mkdir()
+    monkeypatch.setenv('RESULTS_DB', str(state_dir / 'results.db'))
+    monkeypatch.setenv('FINGERPRINTS_DB', str(state_dir / 'fingerprints.db'))
+    monkeypatch.setenv('WHISPER_CACHE_DIR', str(state_dir / 'whisper_cache'))
+
+    relocated = type(validator)()
+    relocated.transcript_cache.close()
+    relocated.fingerprint_db.close()
+    relocated.results_db.close()
+
+    assert sorted(path.name for path in state_dir.iterdir()) == ['fingerprints.db', 'results.db', 'whisper_cache']
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def _tone(validator, freq, seconds, amplitude=0.3):
+    t = np.arange(int(validator.audio_sample_rate * seconds)) / validator.audio_sample_rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _sit(validator):
+    # Три тони SIT (по 0.33 с) і далі повідомлення оператора
+    tones = [_tone(validator, freq, 0.33) for freq in validator.sit_frequencies]
+    rng = np.random.default_rng(0)
+    speech = rng.normal(0, 0.1, validator.audio_sample_rate * 3).astype(np.float32)
+    return np.concatenate(tones + [speech])
+
+
+def test_three_tone_sit_is_detected(validator):
+    assert validator.has_sit_tone(_sit(validator))
+
+
+def test_sit_after_short_silence_is_detected(validator):
+    silence = np.zeros(int(validator.audio_sample_rate * 0.3), dtype=np.float32)
+    assert validator.has_sit_tone(np.concatenate([silence, _sit(validator)]))
+
+
+def test_noise_is_not_sit(validator):
+    rng = np.random.default_rng(1)
+    noise = rng.normal(0, 0.2, validator.audio_sample_rate * 5).astype(np.float32)
+    assert not validator.has_sit_tone(noise)
+
+
+def test_single_tone_is_not_sit(validator):
+    # Гудок на одній частоті SIT - лише один тон послідовності
+    assert not validator.has_sit_tone(_tone(validator, validator.sit_frequencies[0], 3))
+    assert not validator.has_sit_tone(_tone(validator, 425, 3))
+
+
+def test_descending_tones_are_not_sit(validator):
+    tones = [_tone(validator, freq, 0.33) for freq in reversed(validator.sit_frequencies)]
+    assert not validator.has_sit_tone(np.concatenate(tones))
+
+
+def test_short_audio_is_not_sit(validator):
+    assert not validator.has_sit_tone(np.zeros(10, dtype=np.float32))
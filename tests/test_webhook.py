@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+
+class FailingCalls:
+    def create(self, **kwargs):
+        raise AssertionError('дзвінок без вебхука')
+
+
+class FakeTwilio:
+    calls = FailingCalls()
+
+
+def test_validate_without_webhook_fails_fast(validator):
+    validator.twilio_client = FakeTwilio()
+
+    result = asyncio.run(validator.validate_phone_number('+380671234567'))
+
+    assert result['status'] == 'ERROR'
+    assert validator._cached_result('+380671234567') is None
+
+
+def test_webhook_context_starts_and_stops_server(validator):
+    validator.webhook_port = 0
+
+    async def run():
+        async with validator.webhook():
+            runner = validator._webhook_runner
+            assert runner is not None
+
+            # Вкладений виклик використовує наявний сервер
+            async with validator.webhook():
+                assert validator._webhook_runner is runner
+
+            assert validator._webhook_runner is runner
+        assert validator._webhook_runner is None
+
+    asyncio.run(run())
+
+
+def test_missing_credentials_fail_before_any_setup(validator, tmp_path, monkeypatch):
+    empty_dir = tmp_path / 'empty'
+    empty_dir.mkdir()
+    monkeypatch.chdir(empty_dir)
+    monkeypatch.delenv('TWILIO_AUTH_TOKEN')
+
+    with pytest.raises(ValueError, match='TWILIO_AUTH_TOKEN'):
+        type(validator)()
+
+    # Кеш і бази даних не створюються
+    assert list(empty_dir.iterdir()) == []
+
+
+class FakeRequest:
+    def __init__(self, path, data):
+        self.path = self.path_qs = path
+        self.headers = {'X-Twilio-Signature': 'signature'}
+        self._data = data
+
+    async def post(self):
+        return self._data
+
+
+class AcceptingValidator:
+    def validate(self, url, params, signature):
+        return True
+
+
+def test_late_callbacks_do_not_leave_call_states(validator):
+    validator.twilio_request_validator = AcceptingValidator()
+
+    async def run():
+        # Запис після тайм-ауту очікування і запис для неприйнятого дзвінка
+        await validator._handle_recording_status(FakeRequest('/twilio/recording', {
+            'CallSid': 'CA1', 'RecordingSid': 'RE1', 'RecordingStatus': 'completed'
+        }))
+        await validator._handle_recording_status(FakeRequest('/twilio/recording', {
+            'CallSid': 'CA2', 'RecordingStatus': 'absent'
+        }))
+        await validator._handle_call_status(FakeRequest('/twilio/status', {
+            'CallSid': 'CA3', 'CallStatus': 'completed'
+        }))
+
+    asyncio.run(run())
+
+    assert validator._call_states == {}
+
+
+def test_callbacks_update_awaited_call(validator):
+    validator.twilio_request_validator = AcceptingValidator()
+
+    async def run():
+        state = validator._new_call_state('CA1')
+        await validator._handle_call_status(FakeRequest('/twilio/status', {
+            'CallSid': 'CA1', 'CallStatus': 'completed'
+        }))
+        await validator._handle_recording_status(FakeRequest('/twilio/recording', {
+            'CallSid': 'CA1', 'RecordingSid': 'RE1', 'RecordingStatus': 'completed'
+        }))
+        return state
+
+    state = asyncio.run(run())
+
+    assert state['completed'].is_set() and state['recorded'].is_set()
+    assert state['call_status'] == 'completed'
+    assert state['recording_sid'] == 'RE1'
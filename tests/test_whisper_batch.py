@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class FakeBatchedPipeline:
+    """Імітація BatchedInferencePipeline.transcribe з faster-whisper >= 1.2"""
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio, language, clip_timestamps, batch_size):
+        segments = []
+        for clip in clip_timestamps:
+            # faster-whisper 1.2 множить межі на частоту дискретизації
+            start = int(clip['start'] * self.sample_rate)
+            end = int(clip['end'] * self.sample_rate)
+            assert 0 <= start < end <= len(audio)
+
+            # Кожен запис заповнений власним значенням - воно ідентифікує запис
+            values = np.unique(audio[start:end])
+            assert len(values) == 1
+            label = int(values[0])
+
+            # Два сегменти на фрагмент, час зміщений на початок фрагмента
+            segments.append(SimpleNamespace(start=clip['start'], text=f' запис {label}'))
+            segments.append(SimpleNamespace(start=clip['start'] + 1.5, text=f' кінець {label}'))
+        return iter(segments), None
+
+
+def test_whisper_batch_maps_segments_to_their_recordings(validator):
+    sample_rate = validator.audio_sample_rate
+    durations = (3, 10, 4.5)
+    audios = [
+        np.full(int(sample_rate * seconds), label, dtype=np.float32)
+        for label, seconds in enumerate(durations, 1)
+    ]
+
+    validator._whisper = object()
+    validator._batched_whisper = FakeBatchedPipeline(sample_rate)
+
+    assert validator._whisper_batch(audios) == [
+        'запис 1 кінець 1',
+        'запис 2 кінець 2',
+        'запис 3 кінець 3',
+    ]
+
+
+def test_cached_texts_belong_to_their_model(validator, monkeypatch):
+    whispered = []
+
+    def fake_whisper_batch(audios):
+        whispered.extend(audios)
+        return [validator.transcript_model] * len(audios)
+
+    monkeypatch.setattr(validator, '_whisper_batch', fake_whisper_batch)
+    audio = np.zeros(validator.audio_sample_rate, dtype=np.float32)
+
+    validator.transcript_model = 'small/int8/uk'
+    assert validator.transcribe_audio(b'mp3', audio) == 'small/int8/uk'
+    assert validator.transcribe_audio(b'mp3', audio) == 'small/int8/uk'
+    assert len(whispered) == 1
+
+    # Інша модель розпізнає запис заново, а не бере текст попередньої
+    validator.transcript_model = 'large-v3/int8/uk'
+    assert validator.transcribe_audio(b'mp3', audio) == 'large-v3/int8/uk'
+    assert len(whispered) == 2
+
+
+def test_fingerprint_texts_belong_to_their_model(validator):
+    fingerprint = list(range(1 << 16, 33 << 16, 1 << 16))
+
+    validator.transcript_model = 'small/int8/uk'
+    validator._store_fingerprint(fingerprint, 'номер не обслуговується')
+    assert validator._find_similar_transcript(fingerprint) == 'номер не обслуговується'
+
+    validator.transcript_model = 'large-v3/int8/uk'
+    assert validator._find_similar_transcript(fingerprint) is None
+
+
+def test_batched_pipeline_loads_model_once(validator, monkeypatch):
+    loaded = []
+
+    def fake_model(*args, **kwargs):
+        loaded.append(args)
+        return SimpleNamespace()
+
+    monkeypatch.setitem(validator._load_whisper.__globals__, 'WhisperModel', fake_model)
+    monkeypatch.setitem(validator._load_whisper.__globals__, 'BatchedInferencePipeline', SimpleNamespace)
+
+    pipeline = validator.batched_whisper
+    assert pipeline.model is validator.whisper
+    assert validator.batched_whisper is pipeline
+    assert loaded == [(validator.whisper_model_size,)]